@@ -5,19 +5,28 @@ This module provides the three core tools as defined in the pipeline design:
 - DocumentETLTool: Processes individual documents
 - BlueprintGenerationTool: Creates analysis blueprints for topics
 - GraphBuildTool: Builds knowledge graph from documents using blueprints
+
+plus DocumentETLToGraphTool, which fuses ETL and graph building for a
+single document.
 """
 
 from .document_etl_tool import DocumentETLTool
 from .blueprint_generation_tool import BlueprintGenerationTool
 from .graph_build_tool import GraphBuildTool
+from .document_etl_to_graph_tool import DocumentETLToGraphTool
 from .orchestrator import PipelineOrchestrator
 from .base import ToolResult, ExecutionStatus
+from .result_store import PipelineResultStore, DiskStore, RedisStore
 
 __all__ = [
     "DocumentETLTool",
     "BlueprintGenerationTool", 
     "GraphBuildTool",
+    "DocumentETLToGraphTool",
     "PipelineOrchestrator",
     "ToolResult",
-    "ExecutionStatus"
+    "ExecutionStatus",
+    "PipelineResultStore",
+    "DiskStore",
+    "RedisStore"
 ]
\ No newline at end of file
@@ -126,10 +126,10 @@ class PipelineAPIIntegration:
         Returns:
             ToolResult with processing results
         """
-        files = [{"path": fp, "metadata": {}} for fp in file_paths]
-        
+        # Each path becomes its own ETL branch; all branches join on a single
+        # blueprint generation for the topic
         context = {
-            "files": files,
+            "file_paths": file_paths,
             "topic_name": topic_name,
             "metadata": metadata or {},
             "llm_client": llm_client,
@@ -6,10 +6,14 @@ well-defined tasks in the pipeline design.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, Optional, List
 import logging
 from pathlib import Path
 import json
+import time
 from datetime import datetime, timezone
 import uuid
 from enum import Enum
@@ -17,6 +21,10 @@ from enum import Enum
 from setting.db import SessionLocal
 
 
+# Session shared by every tool in the current pipeline run, if the orchestrator provides one
+_shared_session: ContextVar[Optional[Any]] = ContextVar("shared_db_session", default=None)
+
+
 class ExecutionStatus(Enum):
     """Tool execution status"""
     PENDING = "pending"
@@ -121,6 +129,9 @@ class BaseTool(ABC):
         """
         Execute the tool with given input data.
         
+        The input may share references with the pipeline context, so tools
+        must treat it as read-only and return new values via ToolResult.
+        
         Args:
             input_data: Dictionary containing tool-specific parameters
             
@@ -129,6 +140,30 @@ class BaseTool(ABC):
         """
         pass
     
+    @contextmanager
+    def session_scope(self) -> Iterator[Any]:
+        """
+        Provide a database session for tool work.
+        
+        Yields the pipeline-wide session when one was passed as ``db_session``
+        (it is not closed here, the orchestrator owns it), otherwise opens a
+        new session from ``session_factory``. Either way, tools commit their
+        work themselves; the shared session keeps one connection for the
+        whole pipeline instead of a checkout per tool.
+        """
+        shared = _shared_session.get()
+        if shared is None:
+            with self.session_factory() as db:
+                yield db
+            return
+        
+        try:
+            yield shared
+        except Exception:
+            # Leave the shared session usable for the rest of the pipeline
+            shared.rollback()
+            raise
+    
     def validate_input(self, input_data: Dict[str, Any]) -> bool:
         """
         Validate input data against the tool's input schema.
@@ -188,9 +223,11 @@ class BaseTool(ABC):
         """
         
         execution_id = execution_id or str(uuid.uuid4())
-        start_time = datetime.now(timezone.utc).isoformat()
+        start_ns = time.perf_counter_ns()
         
-        self.logger.info(f"Starting tool execution: {self.tool_name} ({execution_id})")
+        # Per-tool progress is DEBUG only; pipelines report it in one record at the end
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Starting tool execution: %s (%s)", self.tool_name, execution_id)
         
         try:
             # Validate input
@@ -201,21 +238,27 @@ class BaseTool(ABC):
                     execution_id=execution_id
                 )
             
-            # Execute tool
-            result = self.execute(input_data)
+            # Execute tool, binding the pipeline session for session_scope()
+            token = _shared_session.set(input_data.get("db_session"))
+            try:
+                result = self.execute(input_data)
+            finally:
+                _shared_session.reset(token)
             
             # Add tracking info
-            end_time = datetime.now(timezone.utc).isoformat()
             result.execution_id = execution_id
-            result.duration_seconds = (end_time - start_time).total_seconds()
+            result.duration_seconds = (time.perf_counter_ns() - start_ns) / 1e9
             
-            self.logger.info(f"Tool execution completed: {self.tool_name} ({execution_id}) in {result.duration_seconds:.2f}s")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Tool execution completed: %s (%s) in %.2fs",
+                    self.tool_name, execution_id, result.duration_seconds
+                )
             
             return result
             
         except Exception as e:
-            end_time = datetime.now(timezone.utc).isoformat()
-            duration = (end_time - start_time).total_seconds()
+            duration = (time.perf_counter_ns() - start_ns) / 1e9
             
             self.logger.error(f"Tool execution failed: {self.tool_name} ({execution_id}) - {e}")
             
@@ -226,6 +269,24 @@ class BaseTool(ABC):
                 duration_seconds=duration
             )
 
+    
+    async def aexecute_with_tracking(self, input_data: Dict[str, Any],
+                                     execution_id: Optional[str] = None) -> ToolResult:
+        """
+        Asynchronous variant of execute_with_tracking.
+        
+        Tools are synchronous, so the call runs in a worker thread to keep the
+        event loop free while the tool waits on LLM, database or file I/O.
+        
+        Args:
+            input_data: Dictionary containing tool-specific parameters
+            execution_id: Optional execution ID for tracking
+            
+        Returns:
+            ToolResult with execution results and tracking info
+        """
+        return await asyncio.to_thread(self.execute_with_tracking, input_data, execution_id)
+
 
 class ToolRegistry:
     """Registry for managing available tools."""
@@ -179,7 +179,7 @@ class BlueprintGenerationTool(BaseTool):
             
             self.logger.info(f"Starting blueprint generation for topic: {topic_name}")
             
-            with self.session_factory() as db:
+            with self.session_scope() as db:
                 # Get source data for the topic
                 query = db.query(SourceData).filter(SourceData.topic_name == topic_name)
                 
@@ -263,7 +263,7 @@ class BlueprintGenerationTool(BaseTool):
                 )
                 
                 # Update blueprint with results
-                with self.session_factory() as db:
+                with self.session_scope() as db:
                     blueprint = db.query(AnalysisBlueprint).filter(
                         AnalysisBlueprint.id == blueprint_id
                     ).first()
@@ -307,7 +307,7 @@ class BlueprintGenerationTool(BaseTool):
                 
             except Exception as e:
                 # Update blueprint status to failed
-                with self.session_factory() as db:
+                with self.session_scope() as db:
                     blueprint = db.query(AnalysisBlueprint).filter(
                         AnalysisBlueprint.id == blueprint_id
                     ).first()
@@ -0,0 +1,134 @@
+"""
+DocumentETLToGraphTool: Fused ETL + graph build for a single document.
+
+- Purpose: To add a single document to an existing topic in one step
+- Input: Raw file, Topic name, optional AnalysisBlueprint ID
+- Output: SourceData plus the nodes and relationships extracted from it
+- Maps to: DocumentETLTool followed by GraphBuildTool, without reloading the SourceData in between
+"""
+
+from typing import Dict, Any
+
+from tools.base import BaseTool, ToolResult
+from tools.document_etl_tool import DocumentETLTool
+from tools.graph_build_tool import GraphBuildTool
+from setting.db import SessionLocal
+
+
+class DocumentETLToGraphTool(BaseTool):
+    """
+    Processes a raw document and builds its knowledge graph in one invocation.
+
+    The extracted document is handed from the ETL stage to the graph stage in
+    memory, saving the SourceData/ContentStore read GraphBuildTool would
+    otherwise perform. SourceData is still persisted by the ETL stage first,
+    since graph records reference its ID.
+
+    Input Schema:
+        file_path (str): Path to the document file
+        topic_name (str): Topic name for grouping documents
+        blueprint_id (str, optional): ID of the AnalysisBlueprint to use (defaults to the topic's latest ready one)
+        metadata (dict, optional): Custom metadata to attach
+        force_reprocess (bool, optional): Force reprocessing even if already processed
+        link (str, optional): Document URL/link
+        original_filename (str, optional): Original filename if different from file_path
+        llm_client: LLM client instance (required)
+        embedding_func: Embedding function (optional)
+
+    Output Schema:
+        Union of the DocumentETLTool and GraphBuildTool outputs
+    """
+
+    def __init__(self, session_factory=None):
+        super().__init__(session_factory=session_factory)
+        self.session_factory = session_factory or SessionLocal
+        self.etl_tool = DocumentETLTool(session_factory=self.session_factory)
+        self.graph_tool = GraphBuildTool(session_factory=self.session_factory)
+
+    @property
+    def tool_name(self) -> str:
+        return "DocumentETLToGraphTool"
+
+    @property
+    def tool_key(self) -> str:
+        return "etl_graph"
+
+    @property
+    def tool_description(self) -> str:
+        return "Processes a single raw document and adds its knowledge to the graph in one step"
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        schema = self.etl_tool.input_schema
+        schema["properties"].update({
+            "blueprint_id": {
+                "type": "string",
+                "description": "ID of the AnalysisBlueprint to use"
+            },
+            "llm_client": {
+                "type": "object",
+                "description": "LLM client instance for graph building"
+            },
+            "embedding_func": {
+                "type": "object",
+                "description": "Embedding function for vector operations"
+            }
+        })
+        return schema
+
+    @property
+    def output_schema(self) -> Dict[str, Any]:
+        schema = self.etl_tool.output_schema
+        schema["properties"].update(self.graph_tool.output_schema["properties"])
+        return schema
+
+    def validate_input(self, input_data: Dict[str, Any]) -> bool:
+        """Validate input parameters."""
+        return self.etl_tool.validate_input(input_data)
+
+    def execute(self, input_data: Dict[str, Any]) -> ToolResult:
+        """
+        Execute ETL and graph building for a single document.
+
+        Args:
+            input_data: DocumentETLTool input plus blueprint_id, llm_client
+                and embedding_func
+
+        Returns:
+            ToolResult with combined ETL and graph building results
+        """
+        etl_result, document = self.etl_tool.extract_document(input_data)
+        if not etl_result.success:
+            return etl_result
+
+        graph_input = {
+            "blueprint_id": input_data.get("blueprint_id"),
+            "force_reprocess": input_data.get("force_reprocess", False),
+            "llm_client": input_data.get("llm_client"),
+            "embedding_func": input_data.get("embedding_func")
+        }
+        if document is not None:
+            graph_input["document"] = document
+        else:
+            # Existing SourceData was reused, so there is nothing in memory to hand over
+            graph_input["source_data_id"] = etl_result.data["source_data_id"]
+
+        graph_result = self.graph_tool.execute(graph_input)
+        if not graph_result.success:
+            return ToolResult(
+                success=False,
+                error_message=f"Graph building failed: {graph_result.error_message}",
+                data={"source_data_id": etl_result.data.get("source_data_id")},
+                metadata=etl_result.metadata
+            )
+
+        return ToolResult(
+            success=True,
+            data={**etl_result.data, **graph_result.data},
+            metadata={**graph_result.metadata, **etl_result.metadata}
+        )
+
+
+# Register the tool
+from tools.base import TOOL_REGISTRY
+TOOL_REGISTRY.register(DocumentETLToGraphTool())
@@ -10,9 +10,11 @@ DocumentETLTool: Processes a single raw document file.
 import hashlib
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import logging
 
+from sqlalchemy.exc import IntegrityError
+
 from tools.base import BaseTool, ToolResult
 from etl.extract import extract_source_data
 from knowledge_graph.models import RawDataSource, SourceData, ContentStore
@@ -156,6 +158,29 @@ class DocumentETLTool(BaseTool):
         Returns:
             ToolResult with SourceData processing results
         """
+        result, _ = self.extract_document(input_data)
+        return result
+    
+    def extract_document(self, input_data: Dict[str, Any]) -> Tuple[ToolResult, Optional[Dict[str, Any]]]:
+        """
+        Run ETL and also hand back the processed document in memory.
+        
+        The document uses the format GraphBuildTool builds from SourceData, so
+        fused pipelines can skip reloading it. It is None when no new SourceData
+        was created (existing record reused or failure).
+        
+        Args:
+            input_data: Dictionary containing:
+                - file_path: Path to the document file
+                - topic_name: Topic name for grouping
+                - metadata: Optional custom metadata
+                - force_reprocess: Whether to force reprocessing
+                - link: Optional document link/URL
+                - original_filename: Optional original filename
+                
+        Returns:
+            Tuple of (ToolResult with SourceData processing results, document or None)
+        """
         try:
             file_path = Path(input_data["file_path"])
             topic_name = input_data["topic_name"]
@@ -171,14 +196,14 @@ class DocumentETLTool(BaseTool):
                 return ToolResult(
                     success=False,
                     error_message=f"File not found: {file_path}"
-                )
+                ), None
             
             # Calculate file hash for deduplication
             with open(file_path, 'rb') as f:
                 file_content = f.read()
                 file_hash = hashlib.sha256(file_content).hexdigest()
             
-            with self.session_factory() as db:
+            with self.session_scope() as db:
                 # Check if we already have this content
                 content_store = db.query(ContentStore).filter_by(
                     content_hash=file_hash
@@ -222,7 +247,7 @@ class DocumentETLTool(BaseTool):
                                 "topic_name": topic_name,
                                 "file_size": len(file_content)
                             }
-                        )
+                        ), None
                 
                 # Update status to processing
                 raw_data_source.status = "etl_processing"
@@ -252,7 +277,7 @@ class DocumentETLTool(BaseTool):
                     return ToolResult(
                         success=False,
                         error_message=f"Content extraction failed: {str(e)}"
-                    )
+                    ), None
                 
                 # Create or update ContentStore
                 if not content_store:
@@ -264,8 +289,15 @@ class DocumentETLTool(BaseTool):
                         name=file_path.stem,
                         link=link
                     )
-                    db.add(content_store)
-                    db.flush()
+                    try:
+                        with db.begin_nested():
+                            db.add(content_store)
+                    except IntegrityError:
+                        # Identical content was stored concurrently by another ETL run
+                        content_store = db.query(ContentStore).filter_by(
+                            content_hash=file_hash
+                        ).one()
+                effective_content = content_store.content
                 
                 # Create SourceData record
                 source_data = SourceData(
@@ -294,6 +326,15 @@ class DocumentETLTool(BaseTool):
                 
                 self.logger.info(f"ETL processing completed for file: {file_path}")
                 
+                document = {
+                    "source_id": source_data.id,
+                    "source_name": source_data.name,
+                    "source_content": effective_content or "",
+                    "source_attributes": source_data.attributes or {},
+                    "source_link": source_data.link,
+                    "topic_name": source_data.topic_name
+                }
+                
                 return ToolResult(
                     success=True,
                     data={
@@ -310,14 +351,14 @@ class DocumentETLTool(BaseTool):
                         "file_size": len(file_content),
                         "content_type": source_type
                     }
-                )
+                ), document
                 
         except Exception as e:
             self.logger.error(f"ETL processing failed: {e}")
             return ToolResult(
                 success=False,
                 error_message=str(e)
-            )
+            ), None
 
 
 # Register the tool
@@ -1,7 +1,7 @@
 """
 GraphBuildTool - Extracts knowledge from documents and adds to the global graph using analysis blueprints:
 
-- Input: A single SourceData object and its topic's AnalysisBlueprint
+- Input: A single SourceData object and its topic's AnalysisBlueprint (or a document handed over in memory by ETL)
 - Output: New nodes and relationships added to the global knowledge graph
 - Maps to: KnowledgeGraphBuilder.build logic, enhanced to use AnalysisBlueprint as context
 """
@@ -23,6 +23,7 @@ class GraphBuildTool(BaseTool):
     Input Schema:
         source_data_id (str): ID of the SourceData to process
         blueprint_id (str): ID of the AnalysisBlueprint to use as context
+        document (dict, optional): In-memory document from DocumentETLTool, used instead of source_data_id
         force_reprocess (bool, optional): Force reprocessing even if already processed
         llm_client: LLM client instance (required)
         embedding_func: Embedding function (optional)
@@ -90,6 +91,20 @@ class GraphBuildTool(BaseTool):
                         }
                     }
                 },
+                {
+                    "title": "In-Memory Document Processing",
+                    "required": ["document"],
+                    "properties": {
+                        "document": {
+                            "type": "object",
+                            "description": "Document produced by DocumentETLTool; skips reloading its SourceData"
+                        },
+                        "blueprint_id": {
+                            "type": "string",
+                            "description": "Optional AnalysisBlueprint ID (defaults to the topic's latest ready blueprint)"
+                        }
+                    }
+                },
                 {
                     "title": "Batch Topic Processing",
                     "required": ["topic_name"],
@@ -166,6 +181,7 @@ class GraphBuildTool(BaseTool):
         Args:
             input_data: Dictionary containing either:
                 - Single document: source_data_id + blueprint_id
+                - In-memory document: document (+ optional blueprint_id)
                 - Batch processing: topic_name (+ optional source_data_ids)
                 - force_reprocess: Whether to force reprocessing
                 - llm_client: LLM client instance (required)
@@ -193,7 +209,13 @@ class GraphBuildTool(BaseTool):
             self._initialize_components()
             
             # Determine processing mode
-            if "blueprint_id" in input_data and "source_data_id" in input_data:
+            if input_data.get("document"):
+                # Document handed over in memory by a fused ETL step
+                return self.build_from_document(
+                    input_data["document"],
+                    input_data.get("blueprint_id")
+                )
+            elif "blueprint_id" in input_data and "source_data_id" in input_data:
                 # Single document processing
                 return self._process_single_document(
                     input_data["blueprint_id"], 
@@ -220,12 +242,13 @@ class GraphBuildTool(BaseTool):
                 error_message=str(e)
             )
     
-    def _process_single_document(self, blueprint_id: str, source_data_id: str, force_reprocess: bool = False) -> ToolResult:
+    def _process_single_document(self, blueprint_id: Optional[str], source_data_id: str, force_reprocess: bool = False) -> ToolResult:
         """
         Process a single document with a given blueprint.
         
         Args:
-            blueprint_id: ID of the AnalysisBlueprint to use
+            blueprint_id: ID of the AnalysisBlueprint to use (defaults to the
+                topic's latest ready blueprint)
             source_data_id: ID of the SourceData to process
             force_reprocess: Whether to force reprocessing
             
@@ -235,7 +258,7 @@ class GraphBuildTool(BaseTool):
         try:
             self.logger.info(f"Starting single document processing: {source_data_id}")
             
-            with self.session_factory() as db:
+            with self.session_scope() as db:
                 # Get source data and blueprint
                 source_data = db.query(SourceData).filter(
                     SourceData.id == source_data_id
@@ -247,14 +270,12 @@ class GraphBuildTool(BaseTool):
                         error_message=f"SourceData not found: {source_data_id}"
                     )
                 
-                blueprint = db.query(AnalysisBlueprint).filter(
-                    AnalysisBlueprint.id == blueprint_id
-                ).first()
+                blueprint = self._find_blueprint(db, blueprint_id, source_data.topic_name)
                 
                 if not blueprint:
                     return ToolResult(
                         success=False,
-                        error_message=f"AnalysisBlueprint not found: {blueprint_id}"
+                        error_message=f"AnalysisBlueprint not found: {blueprint_id or source_data.topic_name}"
                     )
                 
                 if blueprint.status != "ready":
@@ -270,7 +291,7 @@ class GraphBuildTool(BaseTool):
                         success=True,
                         data={
                             "source_data_id": source_data_id,
-                            "blueprint_id": blueprint_id,
+                            "blueprint_id": blueprint.id,
                             "reused_existing": True,
                             "status": "already_processed",
                             "entities_created": 0,
@@ -293,7 +314,7 @@ class GraphBuildTool(BaseTool):
                 
                 if result.success:
                     # Update status to completed
-                    with self.session_factory() as db:
+                    with self.session_scope() as db:
                         source_data = db.query(SourceData).filter(
                             SourceData.id == source_data_id
                         ).first()
@@ -304,7 +325,7 @@ class GraphBuildTool(BaseTool):
                 
             except Exception as e:
                 # Update status to failed
-                with self.session_factory() as db:
+                with self.session_scope() as db:
                     source_data = db.query(SourceData).filter(
                         SourceData.id == source_data_id
                     ).first()
@@ -320,6 +341,80 @@ class GraphBuildTool(BaseTool):
                 error_message=str(e)
             )
     
+    def build_from_document(self, document: Dict[str, Any], blueprint_id: Optional[str] = None) -> ToolResult:
+        """
+        Process a freshly extracted document without reloading its SourceData.
+        
+        Only the blueprint is read from the database; SourceData status changes
+        are issued as plain UPDATEs. ``execute`` routes ``document`` input
+        here after setting up the LLM components, so call it through
+        ``execute`` unless they are already initialized.
+        
+        Args:
+            document: Document dict as produced by DocumentETLTool
+            blueprint_id: Optional ID of the AnalysisBlueprint to use
+            
+        Returns:
+            ToolResult with processing results
+        """
+        source_data_id = document["source_id"]
+        topic_name = document["topic_name"]
+        
+        try:
+            self.logger.info(f"Starting in-memory document processing: {source_data_id}")
+            
+            with self.session_scope() as db:
+                blueprint = self._find_blueprint(db, blueprint_id, topic_name)
+                
+                if not blueprint:
+                    return ToolResult(
+                        success=False,
+                        error_message=f"AnalysisBlueprint not found: {blueprint_id or topic_name}"
+                    )
+                
+                if blueprint.status != "ready":
+                    return ToolResult(
+                        success=False,
+                        error_message=f"Blueprint is not ready (status: {blueprint.status})"
+                    )
+            
+            self._set_source_data_status(source_data_id, "graph_processing")
+            
+            try:
+                result = self._process_document(document, blueprint)
+            except Exception:
+                self._set_source_data_status(source_data_id, "graph_failed")
+                raise
+            
+            if result.success:
+                self._set_source_data_status(source_data_id, "graph_completed")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"In-memory document processing failed: {e}")
+            return ToolResult(
+                success=False,
+                error_message=str(e)
+            )
+    
+    def _find_blueprint(self, db, blueprint_id: Optional[str], topic_name: str) -> Optional[AnalysisBlueprint]:
+        """Load the given blueprint, or the topic's latest ready one when no ID is given."""
+        query = db.query(AnalysisBlueprint)
+        if blueprint_id:
+            return query.filter(AnalysisBlueprint.id == blueprint_id).first()
+        return query.filter(
+            AnalysisBlueprint.topic_name == topic_name,
+            AnalysisBlueprint.status == "ready"
+        ).order_by(AnalysisBlueprint.created_at.desc()).first()
+    
+    def _set_source_data_status(self, source_data_id: str, status: str):
+        """Update a SourceData status without loading the record."""
+        with self.session_scope() as db:
+            db.query(SourceData).filter(SourceData.id == source_data_id).update(
+                {"status": status}, synchronize_session=False
+            )
+            db.commit()
+    
     def _process_topic_batch(self, topic_name: str, source_data_ids: Optional[List[str]] = None, force_reprocess: bool = False) -> ToolResult:
         """
         Process a batch of documents for a topic.
@@ -335,7 +430,7 @@ class GraphBuildTool(BaseTool):
         try:
             self.logger.info(f"Starting batch processing for topic: {topic_name}")
             
-            with self.session_factory() as db:
+            with self.session_scope() as db:
                 # Get the latest blueprint for this topic
                 blueprint = db.query(AnalysisBlueprint).filter(
                     AnalysisBlueprint.topic_name == topic_name,
@@ -452,18 +547,31 @@ class GraphBuildTool(BaseTool):
         Returns:
             ToolResult with processing results
         """
-        try:
-            # Convert source data to document format
-            document = self._convert_source_data_to_document(source_data)
+        return self._process_document(self._convert_source_data_to_document(source_data), blueprint)
+    
+    def _process_document(self, document: Dict[str, Any], blueprint: AnalysisBlueprint) -> ToolResult:
+        """
+        Extract triplets from a document dict and add them to the graph.
+        
+        Args:
+            document: Document dictionary (see _convert_source_data_to_document)
+            blueprint: AnalysisBlueprint to use as context
             
+        Returns:
+            ToolResult with processing results
+        """
+        source_data_id = document["source_id"]
+        topic_name = document["topic_name"]
+        
+        try:
             # Get cognitive map for the document (if exists)
             cognitive_maps = self.cm_generator.get_cognitive_maps_for_topic(
-                source_data.topic_name
+                topic_name
             )
             document_cognitive_map = None
             
             for cm in cognitive_maps:
-                if cm.document_id == source_data.id:
+                if cm.document_id == source_data_id:
                     # Convert DocumentSummary to cognitive map format
                     try:
                         business_context = cm.business_context or "{}"
@@ -474,7 +582,7 @@ class GraphBuildTool(BaseTool):
                     
                     document_cognitive_map = {
                         "source_id": cm.document_id,
-                        "source_name": source_data.name,
+                        "source_name": document["source_name"],
                         "summary": cm.summary_content or "",
                         "key_entities": cm.key_entities or [],
                         "theme_keywords": cm.main_themes or [],
@@ -485,18 +593,18 @@ class GraphBuildTool(BaseTool):
             
             # Extract triplets using blueprint context
             triplets = self.graph_builder.extract_triplets_from_document(
-                source_data.topic_name,
+                topic_name,
                 document,
                 blueprint,
                 document_cognitive_map
             )
             
             if not triplets:
-                self.logger.warning(f"No triplets extracted from document: {source_data.id}")
+                self.logger.warning(f"No triplets extracted from document: {source_data_id}")
                 return ToolResult(
                     success=True,
                     data={
-                        "source_data_id": source_data.id,
+                        "source_data_id": source_data_id,
                         "blueprint_id": blueprint.id,
                         "triplets_extracted": 0,
                         "entities_created": 0,
@@ -506,18 +614,18 @@ class GraphBuildTool(BaseTool):
             
             # Convert triplets to graph and save to database
             entities_created, relationships_created = self.graph_builder.convert_triplets_to_graph(
-                triplets, source_data.id
+                triplets, source_data_id
             )
             
             self.logger.info(
-                f"Document {source_data.id}: extracted {len(triplets)} triplets, "
+                f"Document {source_data_id}: extracted {len(triplets)} triplets, "
                 f"created {entities_created} entities, {relationships_created} relationships"
             )
             
             return ToolResult(
                 success=True,
                 data={
-                    "source_data_id": source_data.id,
+                    "source_data_id": source_data_id,
                     "blueprint_id": blueprint.id,
                     "triplets_extracted": len(triplets),
                     "entities_created": entities_created,
@@ -526,7 +634,7 @@ class GraphBuildTool(BaseTool):
             )
             
         except Exception as e:
-            self.logger.error(f"Error processing document {source_data.id}: {e}")
+            self.logger.error(f"Error processing document {source_data_id}: {e}")
             return ToolResult(
                 success=False,
                 error_message=str(e)
@@ -2,16 +2,137 @@
 Pipeline Orchestrator for dynamic tool sequencing.
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+import os
+import threading
+import time
+from collections import ChainMap, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Mapping, Optional, Set, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 import uuid
 
 from tools.base import ToolResult
 from tools.base import TOOL_REGISTRY
+from tools import pipeline_selection
+from tools.result_store import PipelineResultStore
+from knowledge_graph.models import SourceData
 from setting.db import SessionLocal
 
 
+def _stable_key_repr(value: Any) -> str:
+    """
+    Represent non-JSON values (LLM clients, embedding functions) in cache keys.
+    
+    Uses the type or qualified function name plus the model name when one is
+    exposed, so keys stay identical across processes instead of embedding
+    memory addresses.
+    """
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{getattr(value, '__module__', '')}.{value.__qualname__}"
+    provider = getattr(value, "provider", value)
+    model = getattr(provider, "model", "")
+    return f"{type(value).__module__}.{type(value).__qualname__}:{type(provider).__qualname__}:{model}"
+
+
+class _PipelineTimer:
+    """
+    Times a pipeline run and logs its outcome once on exit.
+    
+    Set ``failure`` before leaving the block to log the run as failed;
+    ``stop()`` freezes and returns the duration so results built inside the
+    block report the same value that is logged. Per-tool events recorded with
+    ``record()`` and the run's ``cache_stats`` are flushed in that same final
+    record, so each pipeline emits exactly one.
+    """
+    
+    def __init__(self, logger: logging.Logger, execution_id: str):
+        self.logger = logger
+        self.execution_id = execution_id
+        self.failure: Optional[str] = None
+        self._start_ns: Optional[int] = None
+        self._end_ns: Optional[int] = None
+        self.events: List[Tuple] = []
+        self.cache_stats: Optional[Dict[str, int]] = None
+    
+    def record(self, event: str, tool: str, *details):
+        """Record a timestamped pipeline event, logging it only at DEBUG level."""
+        self.events.append((time.perf_counter_ns(), event, tool, *details))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Pipeline %s %s: %s %s", self.execution_id, event, tool, details,
+                extra={"execution_id": self.execution_id, "tool": tool}
+            )
+    
+    def __enter__(self) -> "_PipelineTimer":
+        self._start_ns = time.perf_counter_ns()
+        return self
+    
+    @property
+    def duration(self) -> float:
+        """Elapsed seconds, frozen once the timer is stopped."""
+        end_ns = self._end_ns if self._end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self._start_ns) / 1e9
+    
+    def stop(self) -> float:
+        if self._end_ns is None:
+            self._end_ns = time.perf_counter_ns()
+        return self.duration
+    
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        duration = self.stop()
+        failure = self.failure or (str(exc) if exc is not None else None)
+        extra = {
+            "execution_id": self.execution_id,
+            "events": self.events,
+            "cache_stats": self.cache_stats,
+            "duration_s": duration
+        }
+        
+        if failure is None:
+            self.logger.info("pipeline_complete: %s in %.2fs", self.execution_id, duration, extra=extra)
+        else:
+            self.logger.error("Pipeline execution failed: %s - %s", self.execution_id, failure, extra=extra)
+        return False
+
+
+@dataclass
+class PipelineNode:
+    """A single tool invocation within a pipeline dependency graph."""
+    key: str
+    tool: str
+    requires: Set[str] = field(default_factory=set)
+    produces: Set[str] = field(default_factory=set)
+    depends_on: Set[str] = field(default_factory=set)
+    branch: Optional[int] = None
+    overrides: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _ResultDigest:
+    """The small subset of a ToolResult that downstream tools consume."""
+    success: bool
+    ids: Dict[str, Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    tool: Optional[str] = None
+    
+    @classmethod
+    def from_result(cls, result: ToolResult, tool: Optional[str] = None) -> "_ResultDigest":
+        return cls(
+            success=result.success,
+            tool=tool,
+            ids={
+                "source_data_id": result.data.get("source_data_id"),
+                "blueprint_id": result.data.get("blueprint_id")
+            },
+            metadata=result.metadata
+        )
+
+
 class PipelineOrchestrator:
     """
     Orchestrates tool execution into dynamic pipelines.
@@ -22,14 +143,38 @@ class PipelineOrchestrator:
     3. Creating new topic with batch documents
     """
     
-    def __init__(self, session_factory=None):
+    def __init__(self, session_factory=None, max_workers: int = 4, cache_size: int = 0,
+                 retain_full_results: bool = False, result_store: Optional[PipelineResultStore] = None,
+                 result_ttl: Optional[int] = 24 * 60 * 60, share_session: bool = True):
         self.session_factory = session_factory or SessionLocal
+        # Run serial pipelines on one session bound to a single connection held
+        # for the whole run. Tools still commit their own work: the graph builder
+        # writes through its own sessions and needs the SourceData rows
+        # committed by ETL first
+        self.share_session = share_session
+        # Keep complete ToolResult payloads in the pipeline output (off by default
+        # so large ETL/graph payloads are released as soon as the tool finishes)
+        self.retain_full_results = retain_full_results
+        # Upper bound on tools executing concurrently within one pipeline
+        self.max_workers = max_workers
         self.logger = logging.getLogger(__name__)
         
+        # LRU cache of successful tool results keyed on (tool_name, input digest);
+        # off by default
+        self.cache_size = cache_size
+        self._result_cache: "OrderedDict[Tuple[str, bytes], ToolResult]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Optional durable second level (disk/Redis) so results survive restarts;
+        # entries expire after result_ttl seconds (a day by default)
+        self.result_store = result_store
+        self.result_ttl = result_ttl
+        
         # Define standard pipelines using tool keys
         self.standard_pipelines = {
             # Knowledge graph pipelines
             "single_doc_existing_topic": ["etl", "graph_build"],
+            "single_doc_fused": ["etl_graph"],  # ETL and graph build in one in-process call
             "batch_doc_existing_topic": ["etl", "blueprint_gen", "graph_build"],
             "new_topic_batch": ["etl", "blueprint_gen", "graph_build"],
             "text_to_graph": ["graph_build"],
@@ -43,8 +188,52 @@ class PipelineOrchestrator:
         self.tool_key_mapping = {
             "etl": "DocumentETLTool",
             "blueprint_gen": "BlueprintGenerationTool", 
-            "graph_build": "GraphBuildTool"
+            "graph_build": "GraphBuildTool",
+            "etl_graph": "DocumentETLToGraphTool"
         }
+        
+        # Context fields each tool consumes and produces, used to derive the
+        # pipeline dependency graph (mirrors the input builders _prepare_tool_input dispatches to)
+        self.tool_dependencies = {
+            "etl": (set(), {"source_data_id"}),
+            "blueprint_gen": ({"source_data_id"}, {"blueprint_id"}),
+            "graph_build": ({"source_data_id", "blueprint_id"}, set()),
+            "etl_graph": (set(), {"source_data_id"})
+        }
+        
+        # Tools whose cache key captures the version of the data they read (the
+        # file's stat). Blueprint generation and graph building depend on
+        # database state their inputs don't reflect, so they always re-run. The
+        # fused etl_graph tool (the default single-document route) is not
+        # memoized either, since its graph stage has the same dependency
+        self.memoized_tools = {"etl"}
+        
+        # Tools that operate on a single document and fan out per file in batches
+        self.per_document_tools = {"etl", "graph_build", "etl_graph"}
+        # Per-document tools whose branches must run one at a time: graph
+        # building checks for an existing entity before inserting it, and
+        # nothing in the schema keeps concurrent branches from duplicating it
+        self.exclusive_tools = {"graph_build", "etl_graph"}
+        # Tools whose input is a file on disk
+        self.file_input_tools = {"etl", "etl_graph"}
+        
+        # Resolve name lookups and input builders once instead of per invocation
+        self._tool_keys = {name: key for key, name in self.tool_key_mapping.items()}
+        self._etl_tool_name = self.tool_key_mapping["etl"]
+        self._blueprint_tool_name = self.tool_key_mapping["blueprint_gen"]
+        self._input_builders = {
+            self.tool_key_mapping["etl"]: self._build_etl_input,
+            self.tool_key_mapping["blueprint_gen"]: self._build_blueprint_input,
+            self.tool_key_mapping["graph_build"]: self._build_graph_input,
+            self.tool_key_mapping["etl_graph"]: self._build_etl_graph_input
+        }
+        self._resolved_tools = {}
+        for tool_keys in self.standard_pipelines.values():
+            for tool_key in tool_keys:
+                tool_name = self.tool_key_mapping[tool_key]
+                tool = TOOL_REGISTRY.get_tool(tool_name)
+                if tool:
+                    self._resolved_tools[tool_name] = tool
     
     def execute_pipeline(self, pipeline_name: str, context: Dict[str, Any], execution_id: Optional[str] = None) -> ToolResult:
         """
@@ -58,8 +247,6 @@ class PipelineOrchestrator:
         Returns:
             ToolResult with pipeline execution results
         """
-        execution_id = execution_id or str(uuid.uuid4())
-        
         if pipeline_name not in self.standard_pipelines:
             return ToolResult(
                 success=False,
@@ -74,80 +261,359 @@ class PipelineOrchestrator:
         """
         Execute a custom pipeline with specific tool sequence.
         
+        Synchronous wrapper around ``aexecute_custom_pipeline``. When called
+        from a thread that is already running an event loop (e.g. a FastAPI
+        handler), the pipeline runs on its own loop in a worker thread and
+        this call blocks until it finishes.
+        
         Args:
-            tools: List of tool names to execute in sequence
+            tools: List of tool names in pipeline order
             context: Context data for pipeline execution
             execution_id: Optional execution ID for tracking
             
         Returns:
             ToolResult with pipeline execution results
         """
-        execution_id = execution_id or str(uuid.uuid4())
-        start_time = datetime.now(timezone.utc)
+        coroutine = self.aexecute_custom_pipeline(tools, context, execution_id)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
         
-        self.logger.info(f"Starting pipeline execution: {execution_id} - {tools}")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+    
+    async def aexecute_custom_pipeline(self, tools: List[str], context: Dict[str, Any],
+                                       execution_id: Optional[str] = None) -> ToolResult:
+        """
+        Execute a custom pipeline with specific tool sequence asynchronously.
         
-        results = {}
-        pipeline_context = context.copy()
+        The tool sequence is turned into a dependency graph (see
+        ``_build_pipeline_nodes``) and every node whose upstream nodes have
+        completed is scheduled as a task, with at most ``max_workers`` tools
+        in flight.  Linear pipelines therefore run exactly as before, while
+        batch pipelines fan out one ETL / graph build branch per file that all
+        join on a single blueprint generation.
         
-        try:
-            for tool_name in tools:
-                tool = TOOL_REGISTRY.get_tool(tool_name)
-                if not tool:
-                    return ToolResult(
-                        success=False,
-                        error_message=f"Tool '{tool_name}' not found"
-                    )
+        Args:
+            tools: List of tool names in pipeline order
+            context: Context data for pipeline execution
+            execution_id: Optional execution ID for tracking
+            
+        Returns:
+            ToolResult with pipeline execution results
+        """
+        # Generated only here, where it is actually used; hex skips the dashed format
+        execution_id = execution_id or uuid.uuid4().hex
+        
+        self.logger.info(
+            "Starting pipeline execution: %s - %s at %s",
+            execution_id, tools, datetime.now(timezone.utc).isoformat(),
+            extra={"execution_id": execution_id, "pipeline": tools}
+        )
+        
+        results: Dict[str, _ResultDigest] = {}
+        full_results: Dict[str, ToolResult] = {}
+        # Tool updates are written into an owned top layer over the caller's
+        # context instead of copying it
+        pipeline_context = ChainMap({}, context)
+        
+        with _PipelineTimer(self.logger, execution_id) as timer:
+            try:
+                nodes = self._build_pipeline_nodes(tools, pipeline_context)
                 
-                # Prepare input for this tool
-                tool_input = self._prepare_tool_input(tool_name, pipeline_context, results)
+                resolved_tools = {}
+                for node in nodes:
+                    tool = resolved_tools.get(node.tool) or self._resolve_tool(node.tool)
+                    if not tool:
+                        timer.failure = f"Tool '{node.tool}' not found"
+                        return ToolResult(
+                            success=False,
+                            error_message=timer.failure,
+                            execution_id=execution_id,
+                            duration_seconds=timer.stop()
+                        )
+                    resolved_tools[node.tool] = tool
                 
-                # Execute tool
-                self.logger.info(f"Executing tool: {tool_name}")
-                result = tool.execute_with_tracking(tool_input, f"{execution_id}_{tool_name}")
+                nodes_by_key = {node.key: node for node in nodes}
+                node_positions = {node.key: index for index, node in enumerate(nodes)}
+                pending = dict(nodes_by_key)
+                running = {}
+                semaphore = asyncio.Semaphore(self.max_workers)
+                exclusive_locks = {
+                    node.tool: asyncio.Lock() for node in nodes
+                    if self._tool_keys.get(node.tool) in self.exclusive_tools
+                }
+                use_cache = not (context.get("force_reprocess") or context.get("force_regenerate"))
+                cache_stats = {"hits": 0, "misses": 0}
+                if use_cache:
+                    timer.cache_stats = cache_stats
                 
-                if not result.success:
-                    return ToolResult(
-                        success=False,
-                        error_message=f"Tool '{tool_name}' failed: {result.error_message}",
-                        execution_id=execution_id,
-                        data={"failed_tool": tool_name, "previous_results": results}
-                    )
+                # Sessions are not thread-safe, so only share one when no two
+                # tools can run at the same time. It is bound to one pooled
+                # connection held for the whole run, so the tools' own commits
+                # don't hand the connection back to the pool in between
+                shared_session = None
+                connection = None
+                if self.share_session and self._is_serial(nodes):
+                    connection = self._get_engine().connect()
+                    shared_session = self.session_factory(bind=connection)
+                    pipeline_context.maps[0]["_db_session"] = shared_session
                 
-                results[tool_name] = result
-                pipeline_context = self._update_context(tool_name, pipeline_context, result)
+                try:
+                    while pending or running:
+                        # Schedule every node whose dependencies have all completed
+                        ready = [node for node in pending.values() if node.depends_on <= results.keys()]
+                        for node in ready:
+                            del pending[node.key]
+                            tool = resolved_tools[node.tool]
+                            
+                            # Prepare input for this tool
+                            node_context = pipeline_context.new_child(node.overrides) if node.overrides else pipeline_context
+                            dependency_results = {
+                                dep: results[dep] for dep in sorted(node.depends_on, key=node_positions.get)
+                            }
+                            tool_input = self._prepare_tool_input(node.tool, node_context, dependency_results)
+                            
+                            # Execute tool
+                            timer.record("tool_start", node.key)
+                            task = asyncio.create_task(
+                                self._aexecute_tool(
+                                    tool, tool_input, f"{execution_id}_{node_positions[node.key]}",
+                                    semaphore, use_cache, cache_stats, exclusive_locks.get(node.tool)
+                                )
+                            )
+                            running[task] = node
+                        
+                        if not running:
+                            unresolved = ", ".join(pending)
+                            raise RuntimeError(f"Pipeline has unresolvable dependencies: {unresolved}")
+                        
+                        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            node = running.pop(task)
+                            result = task.result()
+                            timer.record("tool_end", node.key, result.success)
+                            
+                            if not result.success:
+                                timer.failure = f"Tool '{node.key}' failed: {result.error_message}"
+                                return ToolResult(
+                                    success=False,
+                                    error_message=timer.failure,
+                                    execution_id=execution_id,
+                                    duration_seconds=timer.stop(),
+                                    data={
+                                        "failed_tool": node.key,
+                                        "previous_results": full_results if self.retain_full_results else {
+                                            key: digest.ids for key, digest in results.items()
+                                        },
+                                        "events": timer.events
+                                    }
+                                )
+                            
+                            results[node.key] = _ResultDigest.from_result(result, node.tool)
+                            if self.retain_full_results:
+                                full_results[node.key] = result
+                            self._update_context(node.tool, pipeline_context, result)
+                finally:
+                    # Cancelling only stops siblings that haven't started (still
+                    # waiting on a lock or worker slot). Tools already running
+                    # in worker threads can't be interrupted and run to
+                    # completion; asyncio.run waits for them before returning
+                    for task in running:
+                        task.cancel()
+                    if running:
+                        await asyncio.gather(*running, return_exceptions=True)
+                    
+                    # Tools commit their own work; anything left uncommitted is
+                    # discarded on close, as with per-tool sessions
+                    if shared_session is not None:
+                        try:
+                            shared_session.close()
+                        finally:
+                            connection.close()
                 
-                self.logger.info(f"Tool completed: {tool_name}")
-            
-            # Calculate duration
-            end_time = datetime.now(timezone.utc)
-            duration = (end_time - start_time).total_seconds()
-            
-            self.logger.info(f"Pipeline execution completed: {execution_id} in {duration:.2f}s")
-            
-            return ToolResult(
-                success=True,
-                data={
-                    "results": results,
+                duration = timer.stop()
+                
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        "Pipeline %s results: %s", execution_id,
+                        {key: (digest.success, digest.ids) for key, digest in results.items()}
+                    )
+                
+                data = {
                     "pipeline": tools,
+                    "ids": {key: digest.ids for key, digest in results.items()},
+                    "cache_stats": cache_stats,
+                    "events": timer.events,
                     "duration_seconds": duration
-                },
-                execution_id=execution_id,
-                duration_seconds=duration
-            )
+                }
+                if self.retain_full_results:
+                    data["results"] = full_results
+                
+                return ToolResult(
+                    success=True,
+                    data=data,
+                    execution_id=execution_id,
+                    duration_seconds=duration
+                )
+                
+            except Exception as e:
+                timer.failure = str(e)
+                return ToolResult(
+                    success=False,
+                    error_message=timer.failure,
+                    execution_id=execution_id,
+                    duration_seconds=timer.stop()
+                )
+    
+    def _get_engine(self):
+        """The engine behind ``session_factory``, without checking out a connection."""
+        with self.session_factory() as probe:
+            return probe.get_bind()
+    
+    def _resolve_tool(self, tool_name: str):
+        """Get a tool instance, resolving and remembering registry lookups lazily."""
+        tool = self._resolved_tools.get(tool_name)
+        if tool is None:
+            tool = TOOL_REGISTRY.get_tool(tool_name)
+            if tool is not None:
+                self._resolved_tools[tool_name] = tool
+        return tool
+    
+    def clear_cache(self):
+        """Drop all memoized tool results."""
+        with self._cache_lock:
+            self._result_cache.clear()
+    
+    async def _aexecute_tool(self, tool, tool_input: Dict[str, Any], execution_id: str,
+                             semaphore: asyncio.Semaphore, use_cache: bool = True,
+                             cache_stats: Optional[Dict[str, int]] = None,
+                             exclusive: Optional[asyncio.Lock] = None) -> ToolResult:
+        """
+        Execute a tool, reusing a memoized result for identical input.
+        
+        Only tools in ``memoized_tools`` are cached, since their keys change
+        whenever the underlying data does. The in-process LRU is checked first,
+        then the durable result store (if configured); fresh successful
+        results are written to both.
+        
+        Args:
+            tool: Tool instance to execute
+            tool_input: Prepared input for the tool
+            execution_id: Execution ID for tracking
+            semaphore: Limits the number of tools executing concurrently
+            use_cache: Whether cached results may be returned and stored
+            cache_stats: Optional hit/miss counters updated in place
+            exclusive: Optional lock serializing the branches of this tool
             
+        Returns:
+            ToolResult from the cache or from a fresh execution
+        """
+        cacheable = self._tool_keys.get(tool.tool_name) in self.memoized_tools
+        if not (use_cache and cacheable) or (self.cache_size <= 0 and self.result_store is None):
+            return await self._arun_tool(tool, tool_input, execution_id, semaphore, exclusive)
+        
+        cache_stats = cache_stats if cache_stats is not None else {"hits": 0, "misses": 0}
+        cache_key = self._make_cache_key(tool.tool_name, tool_input)
+        with self._cache_lock:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+        
+        # Either level may hold a result that outlived the rows it refers to
+        if cached is not None and not await self._ais_live(tool, cached):
+            with self._cache_lock:
+                self._result_cache.pop(cache_key, None)
+            cached = None
+        
+        if cached is None and self.result_store is not None:
+            try:
+                cached = await asyncio.to_thread(self.result_store.get, cache_key)
+            except Exception as e:
+                self.logger.warning("Result store lookup failed for %s: %s", tool.tool_name, e)
+                cached = None
+            if cached is not None and await self._ais_live(tool, cached):
+                self._remember_result(cache_key, cached)
+            else:
+                cached = None
+        
+        if cached is not None:
+            cache_stats["hits"] += 1
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Reusing cached result for tool: %s (%s)", tool.tool_name, execution_id,
+                    extra={"execution_id": execution_id, "tool": tool.tool_name}
+                )
+            return cached
+        
+        cache_stats["misses"] += 1
+        result = await self._arun_tool(tool, tool_input, execution_id, semaphore, exclusive)
+        
+        # Only successful results are worth replaying
+        if result.success:
+            self._remember_result(cache_key, result)
+            if self.result_store is not None:
+                try:
+                    await asyncio.to_thread(self.result_store.put, cache_key, result, self.result_ttl)
+                except Exception as e:
+                    self.logger.warning("Result store write failed for %s: %s", tool.tool_name, e)
+        
+        return result
+    
+    async def _arun_tool(self, tool, tool_input: Dict[str, Any], execution_id: str,
+                         semaphore: asyncio.Semaphore, exclusive: Optional[asyncio.Lock] = None) -> ToolResult:
+        """Run a tool within the pipeline's concurrency limits."""
+        if exclusive is None:
+            async with semaphore:
+                return await tool.aexecute_with_tracking(tool_input, execution_id)
+        
+        # Take the tool's lock first so waiting branches don't hold worker slots
+        async with exclusive, semaphore:
+            return await tool.aexecute_with_tracking(tool_input, execution_id)
+    
+    async def _ais_live(self, tool, cached: ToolResult) -> bool:
+        """Whether a cached result can still be replayed; lookup errors count as stale."""
+        try:
+            return await asyncio.to_thread(self._source_data_exists, cached)
         except Exception as e:
-            end_time = datetime.now(timezone.utc)
-            duration = (end_time - start_time).total_seconds()
-            
-            self.logger.error(f"Pipeline execution failed: {execution_id} - {e}")
-            
-            return ToolResult(
-                success=False,
-                error_message=str(e),
-                execution_id=execution_id,
-                duration_seconds=duration
-            )
+            self.logger.warning("Cached result check failed for %s: %s", tool.tool_name, e)
+            return False
+    
+    def _source_data_exists(self, result: ToolResult) -> bool:
+        """Whether the SourceData a cached result points at is still in the database."""
+        source_data_id = result.data.get("source_data_id")
+        if not source_data_id:
+            return True
+        with self.session_factory() as db:
+            return db.query(SourceData.id).filter(SourceData.id == source_data_id).first() is not None
+    
+    def _remember_result(self, cache_key: Tuple[str, bytes], result: ToolResult):
+        """Insert a result into the in-process LRU, evicting the oldest entries."""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._result_cache[cache_key] = result
+            self._result_cache.move_to_end(cache_key)
+            while len(self._result_cache) > self.cache_size:
+                self._result_cache.popitem(last=False)
+    
+    def _make_cache_key(self, tool_name: str, tool_input: Dict[str, Any]) -> Tuple[str, bytes]:
+        """Build a stable memoization key for a tool invocation."""
+        key_data = dict(tool_input)
+        key_data.pop("db_session", None)
+        
+        # Include file stats for ETL so edits to the file invalidate the entry
+        file_path = tool_input.get("file_path")
+        if self._tool_keys.get(tool_name) in self.file_input_tools and file_path:
+            try:
+                stat = os.stat(file_path)
+                key_data["_file_stat"] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                key_data["_file_stat"] = None
+        
+        serialized = json.dumps(key_data, sort_keys=True, default=_stable_key_repr).encode("utf-8")
+        return tool_name, hashlib.blake2b(serialized).digest()
     
     def select_default_pipeline(self, target_type: str, topic_name: str, file_count: int, is_new_topic: bool, 
                               input_type: str = "document", file_extension: str = None) -> str:
@@ -165,109 +631,198 @@ class PipelineOrchestrator:
         Returns:
             Name of the default pipeline to use
         """
+        return pipeline_selection.select(target_type, file_count, is_new_topic, input_type=input_type)
+    
+    def _build_pipeline_nodes(self, tools: List[str], context: Mapping[str, Any]) -> List[PipelineNode]:
+        """
+        Build the dependency graph for a tool sequence.
         
-        # Memory pipeline for dialogue history/chat
-        if target_type == "personal_memory" or input_type == "dialogue":
-            if input_type == "dialogue":
-                return "memory_direct_graph"  # Direct graph extraction from dialogue
-            else:
-                return "memory_single"  # Single memory processing
-        
-        # Knowledge graph pipeline for documents
-        if target_type == "knowledge_graph":
-            # Document processing pipeline
-            if input_type == "document":
-                if is_new_topic:
-                    return "new_topic_batch"
-                elif file_count == 1:
-                    return "single_doc_existing_topic"
-                else:
-                    return "batch_doc_existing_topic"
-            elif input_type == "text":
-                return "text_to_graph"  # Direct text processing
+        A node depends on every earlier node that produces a field it requires.
+        Tools without declared dependencies (custom tools) keep sequential
+        semantics: they wait for every earlier node and every later node waits
+        for them. A tool listed more than once gets a positional key so each
+        occurrence runs. When the context carries more than one file (``files`` or ``file_paths``)
+        and the pipeline contains ETL, per-document tools are expanded into one
+        sibling node per file; topic-level tools (blueprint generation) become
+        join nodes that wait for every branch, so the whole batch shares a
+        single blueprint invocation.
         
-        # Default fallback
-        return "single_doc_existing_topic"
-    
-    def _prepare_tool_input(self, tool_name: str, context: Dict[str, Any], 
-                           previous_results: Dict[str, ToolResult]) -> Dict[str, Any]:
-        """Prepare input for a specific tool based on context and previous results."""
+        Args:
+            tools: List of tool names in declared order
+            context: Context data for pipeline execution
+            
+        Returns:
+            List of pipeline nodes in declared order
+        """
+        files = self._get_batch_files(context)
+        tool_keys = [self._tool_keys.get(tool_name) for tool_name in tools]
+        fan_out = len(files) > 1 and bool(self.file_input_tools & set(tool_keys))
         
-        # Map tool names to keys for consistent handling
-        tool_key = None
-        for key, name in self.tool_key_mapping.items():
-            if name == tool_name:
-                tool_key = key
-                break
-        
-        if tool_key == "etl":
-            return {
-                "file_path": context.get("file_path"),
-                "topic_name": context.get("topic_name"),
-                "metadata": context.get("metadata", {}),
-                "force_reprocess": context.get("force_reprocess", False),
-                "link": context.get("link"),
-                "original_filename": context.get("original_filename")
-            }
-        
-        elif tool_key == "blueprint_gen":
-            return {
-                "topic_name": context.get("topic_name"),
-                "source_data_ids": context.get("source_data_ids"),
-                "force_regenerate": context.get("force_regenerate", False),
-                "llm_client": context.get("llm_client"),
-                "embedding_func": context.get("embedding_func")
-            }
-        
-        elif tool_key == "graph_build":
-            # Use results from previous tools
-            source_data_id = None
-            blueprint_id = None
+        nodes = []
+        barrier = None
+        for position, (tool_name, tool_key) in enumerate(zip(tools, tool_keys)):
+            sequential = tool_key not in self.tool_dependencies
+            requires, produces = self.tool_dependencies.get(tool_key, (set(), set()))
+            base_key = tool_name if tools.count(tool_name) == 1 else f"{tool_name}@{position}"
             
-            # Check for results from DocumentETLTool
-            etl_tool_name = self.tool_key_mapping.get("etl")
-            if etl_tool_name and etl_tool_name in previous_results:
-                source_data_id = previous_results[etl_tool_name].data.get("source_data_id")
+            if fan_out and tool_key in self.per_document_tools:
+                branches = [(f"{base_key}[{index}]", index) for index in range(len(files))]
             else:
-                source_data_id = context.get("source_data_id")
+                branches = [(base_key, None)]
             
-            # Check for results from BlueprintGenerationTool
-            blueprint_tool_name = self.tool_key_mapping.get("blueprint_gen")
-            if blueprint_tool_name and blueprint_tool_name in previous_results:
-                blueprint_id = previous_results[blueprint_tool_name].data.get("blueprint_id")
-            else:
-                blueprint_id = context.get("blueprint_id")
+            earlier = list(nodes)
             
-            return {
-                "source_data_id": source_data_id,
-                "blueprint_id": blueprint_id,
-                "force_reprocess": context.get("force_reprocess", False),
-                "llm_client": context.get("llm_client"),
-                "embedding_func": context.get("embedding_func")
-            }
-        
-        return context.copy()
-    
-    def _update_context(self, tool_name: str, context: Dict[str, Any], result: ToolResult) -> Dict[str, Any]:
-        """Update context with results from a tool."""
-        updated_context = context.copy()
-        
-        # Map tool name to key
-        tool_key = None
-        for key, name in self.tool_key_mapping.items():
-            if name == tool_name:
-                tool_key = key
-                break
-        
-        if tool_key == "etl" and result.success:
-            updated_context["source_data_id"] = result.data.get("source_data_id")
-            updated_context["topic_name"] = result.metadata.get("topic_name")
+            for key, branch in branches:
+                node = PipelineNode(
+                    key=key,
+                    tool=tool_name,
+                    requires=set(requires),
+                    produces=set(produces),
+                    branch=branch
+                )
+                
+                # Depend on earlier producers in the same branch, or on all of
+                # them when this node is a join (or the producer is shared)
+                if sequential:
+                    node.depends_on.update(upstream.key for upstream in earlier)
+                else:
+                    for upstream in earlier:
+                        if not (upstream.produces & node.requires):
+                            continue
+                        if branch is None or upstream.branch is None or upstream.branch == branch:
+                            node.depends_on.add(upstream.key)
+                    if barrier is not None:
+                        node.depends_on.add(barrier)
+                
+                if tool_key in self.file_input_tools and (fan_out or (files and not context.get("file_path"))):
+                    file_info = files[branch or 0]
+                    node.overrides = {
+                        "file_path": file_info.get("path"),
+                        "metadata": {**context.get("metadata", {}), **file_info.get("metadata", {})}
+                    }
+                    for optional_key in ("link", "original_filename"):
+                        if file_info.get(optional_key):
+                            node.overrides[optional_key] = file_info[optional_key]
+                
+                nodes.append(node)
+            
+            if sequential:
+                barrier = base_key
         
-        elif tool_key == "blueprint_gen" and result.success:
-            updated_context["blueprint_id"] = result.data.get("blueprint_id")
-            updated_context["topic_name"] = result.metadata.get("topic_name")
+        return nodes
+    
+    def _is_serial(self, nodes: List[PipelineNode]) -> bool:
+        """Whether every node waits on its predecessor, so tools never overlap."""
+        return all(previous.key in node.depends_on for previous, node in zip(nodes, nodes[1:]))
+    
+    def _get_batch_files(self, context: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        """Normalize ``files`` entries or plain ``file_paths`` into file dicts."""
+        files = context.get("files")
+        if files:
+            return files
+        return [{"path": file_path} for file_path in context.get("file_paths") or []]
+    
+    def _prepare_tool_input(self, tool_name: str, context: Mapping[str, Any], 
+                           previous_results: Dict[str, _ResultDigest]) -> Dict[str, Any]:
+        """Prepare input for a specific tool based on context and previous results."""
+        builder = self._input_builders.get(tool_name, self._build_default_input)
+        return builder(context, previous_results)
+    
+    def _results_from(self, previous_results: Dict[str, _ResultDigest], tool_name: str) -> List[_ResultDigest]:
+        """Dependency results produced by ``tool_name``, in pipeline order."""
+        return [digest for digest in previous_results.values() if digest.tool == tool_name]
+    
+    def _build_etl_input(self, context: Mapping[str, Any],
+                         previous_results: Dict[str, _ResultDigest]) -> Dict[str, Any]:
+        """Build DocumentETLTool input from the pipeline context."""
+        return {
+            "file_path": context.get("file_path"),
+            "topic_name": context.get("topic_name"),
+            "metadata": context.get("metadata", {}),
+            "force_reprocess": context.get("force_reprocess", False),
+            "link": context.get("link"),
+            "original_filename": context.get("original_filename"),
+            "db_session": context.get("_db_session")
+        }
+    
+    def _build_blueprint_input(self, context: Mapping[str, Any],
+                               previous_results: Dict[str, _ResultDigest]) -> Dict[str, Any]:
+        """Build BlueprintGenerationTool input from the pipeline context."""
+        # The batch's ETL IDs are deliberately not passed: the blueprint must
+        # cover every document in the topic, old and new, and the tool reads
+        # them all when no source_data_ids are given. For a new topic that set
+        # is exactly the batch.
+        return {
+            "topic_name": context.get("topic_name"),
+            "source_data_ids": context.get("source_data_ids"),
+            "force_regenerate": context.get("force_regenerate", False),
+            "llm_client": context.get("llm_client"),
+            "embedding_func": context.get("embedding_func"),
+            "db_session": context.get("_db_session")
+        }
+    
+    def _build_graph_input(self, context: Mapping[str, Any],
+                           previous_results: Dict[str, _ResultDigest]) -> Dict[str, Any]:
+        """Build GraphBuildTool input, preferring IDs produced by upstream tools."""
+        # Check for results from DocumentETLTool (the nearest one in this branch)
+        etl_results = self._results_from(previous_results, self._etl_tool_name)
+        if etl_results:
+            source_data_id = etl_results[-1].ids.get("source_data_id")
+        else:
+            source_data_id = context.get("source_data_id")
+        
+        # Check for results from BlueprintGenerationTool
+        blueprint_results = self._results_from(previous_results, self._blueprint_tool_name)
+        if blueprint_results:
+            blueprint_id = blueprint_results[-1].ids.get("blueprint_id")
+        else:
+            blueprint_id = context.get("blueprint_id")
         
-        return updated_context
+        return {
+            "source_data_id": source_data_id,
+            "blueprint_id": blueprint_id,
+            "force_reprocess": context.get("force_reprocess", False),
+            "llm_client": context.get("llm_client"),
+            "embedding_func": context.get("embedding_func"),
+            "db_session": context.get("_db_session")
+        }
+    
+    def _build_etl_graph_input(self, context: Mapping[str, Any],
+                               previous_results: Dict[str, _ResultDigest]) -> Dict[str, Any]:
+        """Build DocumentETLToGraphTool input from the pipeline context."""
+        return {
+            **self._build_etl_input(context, previous_results),
+            "blueprint_id": context.get("blueprint_id"),
+            "llm_client": context.get("llm_client"),
+            "embedding_func": context.get("embedding_func")
+        }
+    
+    def _build_default_input(self, context: Mapping[str, Any],
+                             previous_results: Dict[str, _ResultDigest]) -> Dict[str, Any]:
+        """Build input for tools without a dedicated builder."""
+        # Unknown tools get the merged view materialized once at the tool
+        # boundary, since input validation expects a plain dict
+        tool_input = dict(context)
+        tool_input["db_session"] = tool_input.pop("_db_session", None)
+        return tool_input
+    
+    def _update_context(self, tool_name: str, context: ChainMap, result: ToolResult):
+        """
+        Update context with results from a tool.
+        
+        Writes go straight into the topmost map, which the orchestrator owns,
+        so the caller's context is never modified and nothing is copied.
+        """
+        layer = context.maps[0]
+        tool_key = self._tool_keys.get(tool_name)
+        
+        if tool_key in self.file_input_tools and result.success:
+            layer["source_data_id"] = result.data.get("source_data_id")
+            layer["topic_name"] = result.metadata.get("topic_name")
+        
+        elif tool_key == "blueprint_gen" and result.success:
+            layer["blueprint_id"] = result.data.get("blueprint_id")
+            layer["topic_name"] = result.metadata.get("topic_name")
     
     def execute_scenario(self, scenario: str, context: Dict[str, Any], execution_id: Optional[str] = None) -> ToolResult:
         """
@@ -310,8 +865,6 @@ class PipelineOrchestrator:
         Returns:
             ToolResult with execution results
         """
-        execution_id = execution_id or str(uuid.uuid4())
-        
         process_strategy = request_data.get("process_strategy", {})
         target_type = request_data.get("target_type", "knowledge_graph")
         metadata = request_data.get("metadata", {})
@@ -324,12 +877,13 @@ class PipelineOrchestrator:
         
         # Default pipeline selection
         topic_name = metadata.get("topic_name")
-        file_count = len(request_data.get("files", []))
+        batch_files = self._get_batch_files(request_data)
+        file_count = len(batch_files) if batch_files else int(bool(request_data.get("file_path")))
         is_new_topic = metadata.get("is_new_topic", False)
         
         # Determine input type and context
         input_type = "dialogue" if target_type == "personal_memory" else "document"
-        if isinstance(request_data.get("input"), str) and not request_data.get("files"):
+        if isinstance(request_data.get("input"), str) and not batch_files:
             input_type = "text"
         
         pipeline_name = self.select_default_pipeline(
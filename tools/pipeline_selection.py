@@ -0,0 +1,66 @@
+"""
+Default pipeline selection.
+
+A pure function shared by the orchestrator and anything that needs to know
+which pipeline a request will run, so the selection logic has one source.
+"""
+
+from itertools import product
+from typing import Dict, Tuple
+
+
+# Default pipeline selection rules, first match wins. Keys are
+# (target_type, input_type, is_new_topic, file_count_token) where "*" matches
+# anything and file_count_token is "1" for a single file, ">1" otherwise.
+_PIPELINE_RULES = [
+    # Memory pipelines for dialogue history/chat
+    (("*", "dialogue", "*", "*"), "memory_direct_graph"),
+    (("personal_memory", "*", "*", "*"), "memory_single"),
+    
+    # Knowledge graph pipelines for documents and raw text
+    (("knowledge_graph", "document", True, "*"), "new_topic_batch"),
+    (("knowledge_graph", "document", False, "1"), "single_doc_fused"),
+    (("knowledge_graph", "document", False, ">1"), "batch_doc_existing_topic"),
+    (("knowledge_graph", "text", "*", "*"), "text_to_graph"),
+]
+_DEFAULT_PIPELINE = "single_doc_existing_topic"
+
+_TARGET_TYPES = ("knowledge_graph", "personal_memory")
+_INPUT_TYPES = ("document", "dialogue", "text")
+
+
+def _build_pipeline_table() -> Dict[Tuple[str, str, bool, str], str]:
+    """Expand the selection rules into a flat lookup over every normalized key."""
+    table = {}
+    for key in product(_TARGET_TYPES + ("*",), _INPUT_TYPES + ("*",), (True, False), ("1", ">1")):
+        table[key] = _DEFAULT_PIPELINE
+        for pattern, pipeline in _PIPELINE_RULES:
+            if all(expected == "*" or expected == actual for expected, actual in zip(pattern, key)):
+                table[key] = pipeline
+                break
+    return table
+
+
+_PIPELINE_TABLE = _build_pipeline_table()
+
+
+def select(target_type: str, file_count: int, is_new_topic: bool, input_type: str = "document") -> str:
+    """
+    Select the default pipeline for a request.
+    
+    Args:
+        target_type: Target type (knowledge_graph, personal_memory)
+        file_count: Number of files to process
+        is_new_topic: Whether this is a new topic
+        input_type: Type of input (document, dialogue, text)
+        
+    Returns:
+        Name of the default pipeline to use
+    """
+    key = (
+        target_type if target_type in _TARGET_TYPES else "*",
+        input_type if input_type in _INPUT_TYPES else "*",
+        bool(is_new_topic),
+        "1" if file_count == 1 else ">1"
+    )
+    return _PIPELINE_TABLE[key]
@@ -0,0 +1,118 @@
+"""
+Persistent stores for memoized pipeline tool results.
+
+The orchestrator keeps an in-process LRU of tool results; a result store adds
+a second, durable level so unchanged inputs are not reprocessed after a
+process restart. Keys are the orchestrator's (tool_name, input digest) pairs.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+import logging
+import pickle
+
+from tools.base import ToolResult
+
+logger = logging.getLogger(__name__)
+
+try:
+    import diskcache
+
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+try:
+    import redis
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+CacheKey = Tuple[str, bytes]
+
+
+class PipelineResultStore(ABC):
+    """Interface for durable tool result storage."""
+
+    def __init__(self, prefix: str = "pipeline_result:"):
+        self.prefix = prefix
+
+    def make_key(self, key: CacheKey) -> str:
+        """Convert an orchestrator cache key into a storage key."""
+        tool_name, digest = key
+        return f"{self.prefix}{tool_name}:{digest.hex()}"
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Optional[ToolResult]:
+        """
+        Get a stored result.
+
+        Args:
+            key: Orchestrator cache key
+
+        Returns:
+            The stored ToolResult, or None if missing or expired
+        """
+        pass
+
+    @abstractmethod
+    def put(self, key: CacheKey, result: ToolResult, ttl: Optional[int] = None):
+        """
+        Store a result.
+
+        Args:
+            key: Orchestrator cache key
+            result: ToolResult to store
+            ttl: Optional time to live in seconds (None keeps it indefinitely)
+        """
+        pass
+
+
+class DiskStore(PipelineResultStore):
+    """Result store backed by a local diskcache directory."""
+
+    def __init__(self, path: str, prefix: str = "pipeline_result:"):
+        if not DISKCACHE_AVAILABLE:
+            raise ImportError(
+                "diskcache is required for DiskStore. Install it using `pip install diskcache`."
+            )
+        super().__init__(prefix)
+        self.cache = diskcache.Cache(path)
+
+    def get(self, key: CacheKey) -> Optional[ToolResult]:
+        return self.cache.get(self.make_key(key))
+
+    def put(self, key: CacheKey, result: ToolResult, ttl: Optional[int] = None):
+        self.cache.set(self.make_key(key), result, expire=ttl)
+
+
+class RedisStore(PipelineResultStore):
+    """Result store backed by Redis."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", client=None,
+                 prefix: str = "pipeline_result:"):
+        if client is None and not REDIS_AVAILABLE:
+            raise ImportError(
+                "redis is required for RedisStore. Install it using `pip install redis`."
+            )
+        super().__init__(prefix)
+        self.client = client or redis.Redis.from_url(url)
+
+    def get(self, key: CacheKey) -> Optional[ToolResult]:
+        payload = self.client.get(self.make_key(key))
+        if payload is None:
+            return None
+        try:
+            return pickle.loads(payload)
+        except Exception as e:
+            logger.warning("Discarding unreadable cached result %s: %s", self.make_key(key), e)
+            return None
+
+    def put(self, key: CacheKey, result: ToolResult, ttl: Optional[int] = None):
+        payload = pickle.dumps(result)
+        if ttl:
+            self.client.setex(self.make_key(key), ttl, payload)
+        else:
+            self.client.set(self.make_key(key), payload)
@@ -2,6 +2,9 @@
 Integration test for the flexible pipeline system.
 """
 
+import asyncio
+import threading
+import time
 import unittest
 from unittest.mock import Mock, patch
 from pathlib import Path
@@ -9,8 +12,96 @@ import tempfile
 import os
 
 from tools.orchestrator import PipelineOrchestrator
+from tools import pipeline_selection
 from tools.api_integration import PipelineAPIIntegration
-from tools.base import ToolRegistry
+from tools.base import BaseTool, ToolRegistry, ToolResult
+from tools.result_store import PipelineResultStore
+from tools.document_etl_to_graph_tool import DocumentETLToGraphTool
+from tools.graph_build_tool import GraphBuildTool
+from knowledge_graph.models import Base, SourceData, AnalysisBlueprint
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+class StubTool:
+    """Records invocations and returns a canned ToolResult."""
+    
+    def __init__(self, tool_name, calls, data=None, success=True):
+        self.tool_name = tool_name
+        self.calls = calls
+        self.data = data or (lambda tool_input: {})
+        self.success = success
+    
+    async def aexecute_with_tracking(self, input_data, execution_id=None):
+        self.calls.append((self.tool_name, input_data))
+        return ToolResult(
+            success=self.success,
+            error_message=None if self.success else "stub failure",
+            data=self.data(input_data),
+            metadata={"topic_name": input_data.get("topic_name")}
+        )
+
+
+class DictStore(PipelineResultStore):
+    """In-memory result store standing in for disk/Redis."""
+    
+    def __init__(self):
+        super().__init__()
+        self.entries = {}
+    
+    def get(self, key):
+        entry = self.entries.get(self.make_key(key))
+        return entry[0] if entry else None
+    
+    def put(self, key, result, ttl=None):
+        self.entries[self.make_key(key)] = (result, ttl)
+
+
+class CommittingTool(BaseTool):
+    """Real BaseTool that commits a statement through session_scope()."""
+    
+    def __init__(self, tool_name, session_factory):
+        super().__init__(session_factory=session_factory)
+        self._tool_name = tool_name
+    
+    @property
+    def tool_name(self):
+        return self._tool_name
+    
+    @property
+    def tool_description(self):
+        return "Commits one statement"
+    
+    def validate_input(self, input_data):
+        return True
+    
+    def execute(self, input_data):
+        with self.session_scope() as db:
+            db.execute(text("SELECT 1"))
+            db.commit()
+        return ToolResult(success=True)
+
+
+def make_scratch_session_factory():
+    """In-memory database holding the SourceData and AnalysisBlueprint tables."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[SourceData.__table__, AnalysisBlueprint.__table__])
+    return sessionmaker(bind=engine)
+
+
+def make_stub_orchestrator(calls, **kwargs):
+    """Build an orchestrator whose standard tools are stubs."""
+    orchestrator = PipelineOrchestrator(share_session=False, **kwargs)
+    stubs = {
+        "DocumentETLTool": lambda tool_input: {"source_data_id": f"sd-{os.path.basename(tool_input['file_path'] or '')}"},
+        "BlueprintGenerationTool": lambda tool_input: {"blueprint_id": "bp-1"},
+        "GraphBuildTool": None,
+        "Custom": None
+    }
+    for tool_name, data in stubs.items():
+        orchestrator._resolved_tools[tool_name] = StubTool(tool_name, calls, data)
+    return orchestrator
 
 class TestPipelineIntegration(unittest.TestCase):
     """Test the complete pipeline integration."""
@@ -39,6 +130,7 @@ class TestPipelineIntegration(unittest.TestCase):
         """Test pipeline definitions match design document scenarios."""
         expected_pipelines = {
             "single_doc_existing_topic": ["etl", "graph_build"],
+            "single_doc_fused": ["etl_graph"],
             "batch_doc_existing_topic": ["etl", "blueprint_gen", "graph_build"],
             "new_topic_batch": ["etl", "blueprint_gen", "graph_build"],
             "memory_direct_graph": ["graph_build"],
@@ -76,7 +168,7 @@ class TestPipelineIntegration(unittest.TestCase):
         pipeline = self.orchestrator.select_default_pipeline(
             "knowledge_graph", "existing_topic", 1, False
         )
-        self.assertEqual(pipeline, "single_doc_existing_topic")
+        self.assertEqual(pipeline, "single_doc_fused")
         
         pipeline = self.orchestrator.select_default_pipeline(
             "knowledge_graph", "existing_topic", 3, False
@@ -99,6 +191,13 @@ class TestPipelineIntegration(unittest.TestCase):
         )
         self.assertEqual(pipeline, "memory_single")
     
+    def test_pipeline_selection_table(self):
+        """Test wildcard rules and the default for unknown types."""
+        self.assertEqual(pipeline_selection.select("knowledge_graph", 0, False, input_type="text"), "text_to_graph")
+        self.assertEqual(pipeline_selection.select("knowledge_graph", 1, True), "new_topic_batch")
+        self.assertEqual(pipeline_selection.select("other", 1, False, input_type="dialogue"), "memory_direct_graph")
+        self.assertEqual(pipeline_selection.select("other", 2, False, input_type="other"), "single_doc_existing_topic")
+    
     def test_api_integration_context_preparation(self):
         """Test API integration context preparation."""
         request_data = {
@@ -114,5 +213,279 @@ class TestPipelineIntegration(unittest.TestCase):
         self.assertEqual(context["metadata"]["topic_name"], "test_topic")
         self.assertEqual(len(context["files"]), 1)
 
+
+class TestPipelineScheduling(unittest.TestCase):
+    """Test the DAG scheduler with stub tools."""
+    
+    def setUp(self):
+        self.calls = []
+        self.orchestrator = make_stub_orchestrator(self.calls, cache_size=0)
+    
+    def test_custom_tool_runs_after_earlier_tools(self):
+        """Tools without declared dependencies keep sequential semantics."""
+        result = self.orchestrator.execute_custom_pipeline(
+            ["DocumentETLTool", "Custom", "GraphBuildTool"],
+            {"file_path": "/docs/a.pdf", "topic_name": "t", "blueprint_id": "bp-0"}
+        )
+        
+        self.assertTrue(result.success)
+        self.assertEqual([name for name, _ in self.calls], ["DocumentETLTool", "Custom", "GraphBuildTool"])
+        self.assertEqual(self.calls[1][1]["source_data_id"], "sd-a.pdf")
+    
+    def test_failure_reports_previous_ids(self):
+        """A failed run reports completed tools in the same shape as the ids of a successful one."""
+        self.orchestrator._resolved_tools["GraphBuildTool"].success = False
+        
+        result = self.orchestrator.execute_custom_pipeline(
+            ["DocumentETLTool", "GraphBuildTool"], {"file_path": "/docs/a.pdf", "topic_name": "t"}
+        )
+        
+        self.assertFalse(result.success)
+        self.assertEqual(result.data["previous_results"],
+                         {"DocumentETLTool": {"source_data_id": "sd-a.pdf", "blueprint_id": None}})
+    
+    def test_repeated_tool_runs_each_time(self):
+        """A tool listed twice is executed twice."""
+        result = self.orchestrator.execute_custom_pipeline(
+            ["GraphBuildTool", "GraphBuildTool"],
+            {"source_data_id": "sd-1", "blueprint_id": "bp-1"}
+        )
+        
+        self.assertTrue(result.success)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(result.data["ids"]), 2)
+    
+    def test_batch_graph_builds_run_one_at_a_time(self):
+        """Graph build branches never overlap, since entity creation is check-then-insert."""
+        session_factory = make_scratch_session_factory()
+        with session_factory() as db:
+            for name in ("a.pdf", "b.pdf", "c.pdf"):
+                db.add(SourceData(id=f"sd-{name}", name=name, topic_name="t", status="created"))
+            db.add(AnalysisBlueprint(id="bp-1", topic_name="t", status="ready", contributing_source_data_ids=[]))
+            db.commit()
+        
+        graph_tool = GraphBuildTool(session_factory=session_factory)
+        self.orchestrator._resolved_tools["GraphBuildTool"] = graph_tool
+        in_flight, peak, lock = [0], [0], threading.Lock()
+        
+        def process(source_data, blueprint):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return ToolResult(success=True, data={})
+        
+        # jsonschema rejects client objects against "type": "object", so skip validation here
+        with patch.object(graph_tool, "validate_input", return_value=True), \
+                patch.object(graph_tool, "_initialize_components"), \
+                patch.object(graph_tool, "_process_document_with_blueprint", side_effect=process):
+            result = self.orchestrator.execute_pipeline(
+                "batch_doc_existing_topic",
+                {"topic_name": "t", "llm_client": Mock(), "file_paths": ["/docs/a.pdf", "/docs/b.pdf", "/docs/c.pdf"]}
+            )
+        
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual(peak[0], 1)
+        with session_factory() as db:
+            statuses = {sd.status for sd in db.query(SourceData).all()}
+        self.assertEqual(statuses, {"graph_completed"})
+    
+    def test_serial_pipeline_holds_one_connection(self):
+        """A shared session keeps its connection across the tools' commits."""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir.name, 'pipeline.db')}")
+        self.addCleanup(engine.dispose)
+        checkouts = []
+        event.listen(engine, "checkout", lambda *args: checkouts.append(1))
+        session_factory = sessionmaker(bind=engine)
+        tools = ["First", "Second", "Third"]
+        
+        for share_session, expected in ((True, 1), (False, 3)):
+            checkouts.clear()
+            orchestrator = PipelineOrchestrator(session_factory=session_factory, share_session=share_session)
+            for tool_name in tools:
+                orchestrator._resolved_tools[tool_name] = CommittingTool(tool_name, session_factory)
+            
+            result = orchestrator.execute_custom_pipeline(tools, {})
+            
+            self.assertTrue(result.success, result.error_message)
+            self.assertEqual(len(checkouts), expected)
+    
+    def test_pipeline_logs_once_per_run(self):
+        """Tools going through BaseTool add no INFO records of their own."""
+        session_factory = make_scratch_session_factory()
+        tools = ["First", "Second", "Third"]
+        orchestrator = PipelineOrchestrator(session_factory=session_factory, share_session=False)
+        for tool_name in tools:
+            orchestrator._resolved_tools[tool_name] = CommittingTool(tool_name, session_factory)
+        
+        with self.assertLogs(level="INFO") as logs:
+            result = orchestrator.execute_custom_pipeline(tools, {})
+        
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual([record.name for record in logs.records], ["tools.orchestrator", "tools.orchestrator"])
+        self.assertTrue(logs.records[-1].getMessage().startswith("pipeline_complete"))
+        self.assertEqual(len(logs.records[-1].events), 2 * len(tools))
+    
+    def test_sync_entry_point_inside_running_loop(self):
+        """The sync wrapper works when called from async code."""
+        async def handler():
+            return self.orchestrator.execute_custom_pipeline(
+                ["GraphBuildTool"], {"source_data_id": "sd-1", "blueprint_id": "bp-1"}
+            )
+        
+        result = asyncio.run(handler())
+        
+        self.assertTrue(result.success)
+    
+    def test_batch_fans_out_and_joins_on_blueprint(self):
+        """Batch pipelines run ETL and graph build per file around one blueprint."""
+        result = self.orchestrator.execute_pipeline(
+            "batch_doc_existing_topic",
+            {"topic_name": "t", "file_paths": ["/docs/a.pdf", "/docs/b.pdf", "/docs/c.pdf"]}
+        )
+        
+        self.assertTrue(result.success)
+        names = [name for name, _ in self.calls]
+        self.assertEqual(names.count("DocumentETLTool"), 3)
+        self.assertEqual(names.count("BlueprintGenerationTool"), 1)
+        self.assertEqual(names.count("GraphBuildTool"), 3)
+        self.assertEqual(names.index("BlueprintGenerationTool"), 3)
+        blueprint_input = self.calls[3][1]
+        # Existing topics regenerate from all their documents, not just this batch
+        self.assertIsNone(blueprint_input["source_data_ids"])
+        graph_inputs = [tool_input for name, tool_input in self.calls if name == "GraphBuildTool"]
+        self.assertEqual({tool_input["source_data_id"] for tool_input in graph_inputs},
+                         {"sd-a.pdf", "sd-b.pdf", "sd-c.pdf"})
+        self.assertTrue(all(tool_input["blueprint_id"] == "bp-1" for tool_input in graph_inputs))
+
+
+class TestToolResultCache(unittest.TestCase):
+    """Test that memoization never replays results for changed data."""
+    
+    def setUp(self):
+        self.calls = []
+        self.session_factory = make_scratch_session_factory()
+        self.orchestrator = make_stub_orchestrator(self.calls, cache_size=8, session_factory=self.session_factory)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+    
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+    
+    def _calls_to(self, tool_name):
+        return [name for name, _ in self.calls].count(tool_name)
+    
+    def test_cache_is_off_by_default(self):
+        self.assertEqual(PipelineOrchestrator(share_session=False).cache_size, 0)
+    
+    def test_etl_reused_until_file_changes(self):
+        path = self._write("a.txt", "one")
+        context = {"file_path": path, "topic_name": "t"}
+        with self.session_factory() as db:
+            db.add(SourceData(id="sd-a.txt", name="a.txt", topic_name="t"))
+            db.commit()
+        
+        self.orchestrator.execute_custom_pipeline(["DocumentETLTool"], context)
+        result = self.orchestrator.execute_custom_pipeline(["DocumentETLTool"], context)
+        self.assertEqual(self._calls_to("DocumentETLTool"), 1)
+        self.assertEqual(result.data["cache_stats"]["hits"], 1)
+        
+        self._write("a.txt", "changed")
+        self.orchestrator.execute_custom_pipeline(["DocumentETLTool"], context)
+        self.assertEqual(self._calls_to("DocumentETLTool"), 2)
+    
+    def test_etl_rerun_when_cached_source_data_is_deleted(self):
+        """An in-process hit whose SourceData row is gone is not replayed."""
+        path = self._write("a.txt", "one")
+        context = {"file_path": path, "topic_name": "t"}
+        with self.session_factory() as db:
+            db.add(SourceData(id="sd-a.txt", name="a.txt", topic_name="t"))
+            db.commit()
+        
+        self.orchestrator.execute_custom_pipeline(["DocumentETLTool"], context)
+        with self.session_factory() as db:
+            db.query(SourceData).delete()
+            db.commit()
+        result = self.orchestrator.execute_custom_pipeline(["DocumentETLTool"], context)
+        
+        self.assertEqual(self._calls_to("DocumentETLTool"), 2)
+        self.assertEqual(result.data["cache_stats"], {"hits": 0, "misses": 1})
+    
+    def test_cache_stats_flushed_with_completion_record(self):
+        """Each pipeline logs one completion record carrying events and cache stats."""
+        path = self._write("a.txt", "one")
+        with self.assertLogs("tools.orchestrator", level="INFO") as logs:
+            self.orchestrator.execute_custom_pipeline(["DocumentETLTool"], {"file_path": path, "topic_name": "t"})
+        
+        completion = [record for record in logs.records if record.getMessage().startswith("pipeline_complete")]
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(len(completion), 1)
+        self.assertEqual(completion[0].cache_stats, {"hits": 0, "misses": 1})
+        self.assertEqual([event[1] for event in completion[0].events], ["tool_start", "tool_end"])
+    
+    def test_blueprint_regenerated_for_each_batch(self):
+        """A later batch on the same topic must reach blueprint generation."""
+        pipeline = ["DocumentETLTool", "BlueprintGenerationTool", "GraphBuildTool"]
+        first = [self._write(name, name) for name in ("a.txt", "b.txt", "c.txt")]
+        second = [self._write(name, name) for name in ("d.txt", "e.txt")]
+        
+        self.orchestrator.execute_custom_pipeline(pipeline, {"topic_name": "t", "file_paths": first})
+        self.orchestrator.execute_custom_pipeline(pipeline, {"topic_name": "t", "file_paths": second})
+        
+        self.assertEqual(self._calls_to("BlueprintGenerationTool"), 2)
+        self.assertEqual(self._calls_to("GraphBuildTool"), 5)
+
+    
+    def test_result_store_survives_restart_until_rows_are_gone(self):
+        """Stored results are reused by a new orchestrator only while their SourceData exists."""
+        path = self._write("a.txt", "one")
+        context = {"file_path": path, "topic_name": "t"}
+        store = DictStore()
+        
+        make_stub_orchestrator(self.calls, result_store=store).execute_custom_pipeline(["DocumentETLTool"], context)
+        self.assertEqual([ttl for _, ttl in store.entries.values()], [24 * 60 * 60])
+        
+        restarted = make_stub_orchestrator(self.calls, result_store=store)
+        with patch.object(restarted, "_source_data_exists", return_value=True):
+            result = restarted.execute_custom_pipeline(["DocumentETLTool"], context)
+        self.assertEqual(result.data["cache_stats"], {"hits": 1, "misses": 0})
+        self.assertEqual(self._calls_to("DocumentETLTool"), 1)
+        
+        restarted = make_stub_orchestrator(self.calls, result_store=store)
+        with patch.object(restarted, "_source_data_exists", return_value=False):
+            restarted.execute_custom_pipeline(["DocumentETLTool"], context)
+        self.assertEqual(self._calls_to("DocumentETLTool"), 2)
+
+
+
+class TestDocumentETLToGraphTool(unittest.TestCase):
+    """Test the fused single-document tool against a scratch database."""
+    
+    def setUp(self):
+        self.session_factory = make_scratch_session_factory()
+        with self.session_factory() as db:
+            db.add(SourceData(id="sd-1", name="a.pdf", topic_name="t", status="graph_completed"))
+            db.add(AnalysisBlueprint(id="bp-1", topic_name="t", status="ready", contributing_source_data_ids=[]))
+            db.commit()
+        self.tool = DocumentETLToGraphTool(session_factory=self.session_factory)
+    
+    def test_reingest_uses_latest_topic_blueprint(self):
+        """Reused SourceData resolves the blueprint the same way a fresh ingest does."""
+        etl_result = ToolResult(success=True, data={"source_data_id": "sd-1"}, metadata={"topic_name": "t"})
+        with patch.object(self.tool.etl_tool, "extract_document", return_value=(etl_result, None)), \
+                patch.object(self.tool.graph_tool, "_initialize_components"):
+            result = self.tool.execute({"file_path": "/docs/a.pdf", "topic_name": "t", "llm_client": Mock()})
+        
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual(result.data["blueprint_id"], "bp-1")
+
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()